@@ -2,14 +2,30 @@ from __future__ import annotations
 
 import logging
 import socket
-from collections.abc import Callable, Iterable
-from contextlib import AbstractAsyncContextManager, AsyncExitStack, contextmanager
+import struct
+import sys
+from array import array
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import (
+    AbstractAsyncContextManager,
+    AsyncExitStack,
+    ExitStack,
+    contextmanager,
+)
 from dataclasses import dataclass
+from functools import lru_cache
+from itertools import compress
 from types import TracebackType
 from typing import ClassVar, Generic, TypeVar
 
-from anyio import Event, create_udp_socket
-from anyio.abc import UDPSocket
+from anyio import (
+    Event,
+    getaddrinfo,
+    move_on_after,
+    notify_closing,
+    wait_readable,
+    wait_writable,
+)
 
 LOG = logging.getLogger(__name__)
 
@@ -18,8 +34,19 @@ DEFAULT_PORT_READ = 9999
 DEFAULT_PORT_WRITE = 10000
 DEFAULT_HOST_RX = "0.0.0.0"
 
+RX_BATCH = 64
+RX_BUFFER = 1500
+RX_SOCKET_BUFFER = 1 << 20
 
-@dataclass
+_U16 = struct.Struct("<H")
+_REGVAL = struct.Struct("<HI")
+_REGDATA = struct.Struct("<HH")
+_HDR_MASTER = struct.Struct("<BBBBB")
+_HDR_SLAVE = struct.Struct("<BBB")
+_PRODUCT = struct.Struct(">BH")
+
+
+@dataclass(slots=True, frozen=True)
 class Command:
     command: int
 
@@ -27,7 +54,7 @@ class Command:
         return b""
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class CommandUnknown(Command):
     data: bytes
 
@@ -35,68 +62,84 @@ class CommandUnknown(Command):
         return self.data
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ResponseWrite(Command):
     command: ClassVar[int] = 0x6C
     register: int
 
     def to_bytes(self) -> bytes:
-        return self.register.to_bytes(2, "little")
+        return _U16.pack(self.register)
 
     @classmethod
     def from_bytes(cls, payload: bytes):
-        if len(payload) != 2:
-            raise ParseError(f"Length is not 2: {len(payload)}")
-        return cls(int.from_bytes(payload, "little"))
+        if len(payload) != _U16.size:
+            raise ParseError(f"Length is not {_U16.size}: {len(payload)}")
+        return cls(*_U16.unpack(payload))
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ResponseRead(Command):
     command: ClassVar[int] = 0x6A
     register: int
     value: int
 
     def to_bytes(self) -> bytes:
-        return self.register.to_bytes(2, "little") + self.value.to_bytes(4, "little")
+        return _REGVAL.pack(self.register, self.value)
 
     @classmethod
     def from_bytes(cls, payload: bytes):
-        if len(payload) != 6:
-            raise ParseError(f"Length is not 6: {len(payload)}")
-
-        return cls(
-            int.from_bytes(payload[0:2], "little"),
-            int.from_bytes(payload[2:6], "little"),
-        )
+        if len(payload) != _REGVAL.size:
+            raise ParseError(f"Length is not {_REGVAL.size}: {len(payload)}")
+        return cls(*_REGVAL.unpack(payload))
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ResponseData(Command):
     command: ClassVar[int] = 0x68
     parameters: dict[int, int]
 
     def to_bytes(self) -> bytes:
-        payload = b"".join(
-            register.to_bytes(2, "little") + data.to_bytes(2, "little")
-            for register, data in self.parameters.items()
+        return b"".join(
+            [
+                _REGDATA.pack(register, value)
+                for register, value in self.parameters.items()
+            ]
         )
-        return payload
 
     @classmethod
     def from_bytes(cls, payload: bytes):
-        parameters = {}
-        if len(payload) % 4:
-            raise ParseError(f"Length is not a multiple of 4: {len(payload)}")
-        for idx in range(0, len(payload), 4):
-            register = int.from_bytes(payload[idx : idx + 2], "little")
-            data = int.from_bytes(payload[idx + 2 : idx + 4], "little")
-            if register == 0xFFFF:
-                continue
-            parameters[register] = data
-        return cls(parameters)
-
-
-@dataclass
+        if len(payload) % _REGDATA.size:
+            raise ParseError(
+                f"Length is not a multiple of {_REGDATA.size}: {len(payload)}"
+            )
+        return cls(
+            {
+                register: data
+                for register, data in _REGDATA.iter_unpack(payload)
+                if register != 0xFFFF
+            }
+        )
+
+    @classmethod
+    def from_bytes_array(cls, payload: bytes) -> tuple[array, array]:
+        if len(payload) % _REGDATA.size:
+            raise ParseError(
+                f"Length is not a multiple of {_REGDATA.size}: {len(payload)}"
+            )
+        values = array("H")
+        values.frombytes(payload)
+        if sys.byteorder == "big":
+            values.byteswap()
+        registers = values[0::2]
+        data = values[1::2]
+        if 0xFFFF in registers:
+            selected = [register != 0xFFFF for register in registers]
+            registers = array("H", compress(registers, selected))
+            data = array("H", compress(data, selected))
+        return registers, data
+
+
+@dataclass(slots=True, frozen=True)
 class ResponseRmu(Command):
     command: ClassVar[int] = 0x62
     data: bytes
@@ -106,52 +149,48 @@ class ResponseRmu(Command):
         return cls(payload)
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class RequestReadNull(Command):
     command: ClassVar[int] = 0x69
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class RequestRead(Command):
     command: ClassVar[int] = 0x69
     register: int
 
     def to_bytes(self) -> bytes:
-        return self.register.to_bytes(2, "little")
+        return _U16.pack(self.register)
 
     @classmethod
     def from_bytes(cls, payload: bytes):
-        if len(payload) != 2:
-            raise ParseError(f"Length is not 2: {len(payload)}")
-        return cls(int.from_bytes(payload, "little"))
+        if len(payload) != _U16.size:
+            raise ParseError(f"Length is not {_U16.size}: {len(payload)}")
+        return cls(*_U16.unpack(payload))
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class RequestWriteNull(Command):
     command: ClassVar[int] = 0x6B
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class RequestWrite(Command):
     command: ClassVar[int] = 0x6B
     register: int
     value: int
 
     def to_bytes(self) -> bytes:
-        return self.register.to_bytes(2, "little") + self.value.to_bytes(4, "little")
+        return _REGVAL.pack(self.register, self.value)
 
     @classmethod
     def from_bytes(cls, payload: bytes):
-        if len(payload) != 6:
-            raise ParseError(f"Length is not 6: {len(payload)}")
-
-        return cls(
-            int.from_bytes(payload[0:2], "little"),
-            int.from_bytes(payload[2:6], "little"),
-        )
+        if len(payload) != _REGVAL.size:
+            raise ParseError(f"Length is not {_REGVAL.size}: {len(payload)}")
+        return cls(*_REGVAL.unpack(payload))
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ResponseProduct(Command):
     command: ClassVar[int] = 0x6D
     unknown: int
@@ -160,14 +199,13 @@ class ResponseProduct(Command):
 
     @classmethod
     def from_bytes(cls, payload: bytes):
-        return cls(
-            int.from_bytes(payload[0:1], "little"),
-            int.from_bytes(payload[1:3], "big"),
-            payload[3:].decode("ascii"),
-        )
+        if len(payload) < _PRODUCT.size:
+            raise ParseError(f"Length is less than {_PRODUCT.size}: {len(payload)}")
+        unknown, firmware = _PRODUCT.unpack_from(payload)
+        return cls(unknown, firmware, payload[_PRODUCT.size :].decode("ascii"))
 
 
-@dataclass
+@dataclass(slots=True)
 class Message:
     start: int
 
@@ -175,98 +213,96 @@ class Message:
         return bytes([self.start])
 
 
-@dataclass
+@dataclass(slots=True)
 class MessageMaster(Message):
     start: ClassVar[int] = 0x5C
     address: int
     command: Command
 
     def to_bytes(self):
-        data = bytearray()
-        data.append(self.start)
-        data.append(0x00)
-        data.append(self.address)
-        data.append(self.command.command)
-        payload = self.command.to_bytes()
-        data.append(len(payload))
-        data.extend(payload)
-        data.append(calculate_checksum(data[2:]), self.start)
-        return bytes(data)
+        payload = escape(self.command.to_bytes(), self.start)
+        header = _HDR_MASTER.pack(
+            self.start, 0x00, self.address, self.command.command, len(payload)
+        )
+        data = header + payload
+        checksum = _CHECKSUM_MASTER[_xor_fold(memoryview(data)[2:])]
+        return data + bytes((checksum,))
 
 
-@dataclass
+@dataclass(slots=True)
 class MessageSlave(Message):
     start: ClassVar[int] = 0xC0
     command: Command
 
     def to_bytes(self):
-        data = bytearray()
-        data.append(self.start)
-        data.append(self.command.command)
         payload = self.command.to_bytes()
-        data.append(len(payload))
-        data.extend(payload)
-        data.append(calculate_checksum(data, self.start))
-        return bytes(data)
+        data = _HDR_SLAVE.pack(self.start, self.command.command, len(payload)) + payload
+        return data + bytes((_CHECKSUM_SLAVE[_xor_fold(data)],))
 
 
-@dataclass
+@dataclass(slots=True)
 class MessageAck(Message):
     start: ClassVar[int] = 0x06
 
 
-@dataclass
+@dataclass(slots=True)
 class MessageNak(Message):
     start: ClassVar[int] = 0x15
 
 
-@dataclass
+@dataclass(slots=True)
 class MessageUnknown(Message):
     data: bytes
 
 
+_START_MASTER = MessageMaster.start
+_START_SLAVE = MessageSlave.start
+
+
 class ParseError(Exception):
     pass
 
 
-def unescape(data: Iterable[int], key: int):
-    it = iter(data)
-    try:
-        yield next(it)
-    except StopIteration:
-        return
+_ESCAPE_SINGLE = [bytes((key,)) for key in range(256)]
+_ESCAPE_DOUBLE = [bytes((key, key)) for key in range(256)]
 
-    while True:
-        try:
-            val = next(it)
-            if val == key:
-                val = next(it)
-            yield val
-        except StopIteration:
-            return
 
+def unescape(data: bytes, key: int) -> bytes:
+    if data.find(key, 1) < 0:
+        return data
+    return data[:1] + data[1:].replace(_ESCAPE_DOUBLE[key], _ESCAPE_SINGLE[key])
 
-def escape(data: Iterable[int], key: int):
-    it = iter(data)
-    try:
-        yield next(it)
-    except StopIteration:
-        return
 
-    while True:
-        try:
-            val = next(it)
-            if val == key:
-                yield key
-            yield val
-        except StopIteration:
-            return
+def escape(data: bytes, key: int) -> bytes:
+    if data.find(key, 1) < 0:
+        return data
+    return data[:1] + data[1:].replace(_ESCAPE_SINGLE[key], _ESCAPE_DOUBLE[key])
+
+
+def _xor_fold(data: bytes | memoryview) -> int:
+    if len(data) < 40:
+        result = 0
+        for value in data:
+            result ^= value
+        return result
 
+    # Fold the frame as one big integer, halving the width each step until
+    # every byte has been xor:ed into the lowest one.
+    result = int.from_bytes(data, "little")
+    shift = 8 << len(data).bit_length()
+    while shift > 8:
+        shift >>= 1
+        result ^= result >> shift
+    return result & 0xFF
 
-def calculate_checksum(data: Iterable[int], key: int):
-    result = 0
-    for value in data:
-        result ^= value
+
+def _checksum_table(key: int) -> bytes:
+    swapped = ((key << 4) | (key >> 4)) & 0xFF
+    return bytes(swapped if value == key else value for value in range(256))
+
+
+def calculate_checksum(data: bytes | memoryview, key: int):
+    result = _xor_fold(data)
 
     if result == key:
         result = ((key << 4) | (key >> 4)) & 0xFF
@@ -274,85 +310,176 @@ def calculate_checksum(data: Iterable[int], key: int):
     return result
 
 
-def parse(data: bytes):
-    if len(data) < 5:
-        raise ParseError("Empty packet")
+_CHECKSUM_MASTER = _checksum_table(_START_MASTER)
+_CHECKSUM_SLAVE = _checksum_table(_START_SLAVE)
 
-    if data[0] == MessageMaster.start:
-        data_len = data[4]
-        if len(data) < data_len + 6:
-            raise ParseError(f"Invalid packet length: {data}")
-        data_payload = data[5 : 5 + data_len]
-        data_command = data[3]
-        data_checksum = data[5 + data_len]
-        checksum = calculate_checksum(data[2 : 5 + data_len], data[0])
-        if checksum != data_checksum:
-            raise ParseError(f"Invalid checksum {checksum} expected {data_checksum}")
-        command = parse_payload(
-            data_command, bytes(unescape(data_payload, MessageMaster.start))
-        )
-        return MessageMaster(data[2], command)
-
-    elif data[0] == MessageSlave.start:
-        data = bytes(unescape(data, MessageSlave.start))
-
-        data_len = data[2]
-        if len(data) < data_len + 4:
-            raise ParseError(f"Invalid packet length: {data}")
-        data_payload = data[3 : 3 + data_len]
-        data_command = data[1]
-        data_checksum = data[3 + data_len]
-        checksum = calculate_checksum(data[0 : 3 + data_len], data[0])
-        if checksum != data_checksum:
-            raise ParseError(f"Invalid checksum {checksum} expected {data_checksum}")
-        command = parse_payload(
-            data_command, bytes(unescape(data_payload, MessageSlave.start))
-        )
-        return MessageSlave(command)
 
-    elif data[0] == MessageAck.start:
-        return MessageAck()
+def _decode_master(data: bytes | memoryview) -> tuple[int, int, bytes]:
+    view = memoryview(data)
+    _, _, address, data_command, data_len = _HDR_MASTER.unpack_from(data)
+    if len(data) < data_len + 6:
+        raise ParseError(f"Invalid packet length: {bytes(data)}")
+    data_payload = bytes(view[5 : 5 + data_len])
+    data_checksum = data[5 + data_len]
+    checksum = _CHECKSUM_MASTER[_xor_fold(view[2 : 5 + data_len])]
+    if checksum != data_checksum:
+        raise ParseError(f"Invalid checksum {checksum} expected {data_checksum}")
+    return address, data_command, unescape(data_payload, _START_MASTER)
 
-    elif data[0] == MessageNak.start:
-        return MessageNak()
 
-    else:
-        return MessageUnknown(data[0], data[1:])
+def _decode_slave(data: bytes | memoryview) -> tuple[int, bytes]:
+    data = unescape(bytes(data), _START_SLAVE)
+    view = memoryview(data)
 
+    _, data_command, data_len = _HDR_SLAVE.unpack_from(data)
+    if len(data) < data_len + 4:
+        raise ParseError(f"Invalid packet length: {data}")
+    data_payload = data[3 : 3 + data_len]
+    data_checksum = data[3 + data_len]
+    checksum = _CHECKSUM_SLAVE[_xor_fold(view[0 : 3 + data_len])]
+    if checksum != data_checksum:
+        raise ParseError(f"Invalid checksum {checksum} expected {data_checksum}")
+    return data_command, unescape(data_payload, _START_SLAVE)
 
-def parse_payload(command: int, payload: bytes):
-    if command == ResponseRead.command:
-        return ResponseRead.from_bytes(payload)
 
-    if command == ResponseWrite.command:
-        return ResponseWrite.from_bytes(payload)
+try:
+    from ._parse import decode_master, decode_slave
+except ImportError:
+    decode_master = _decode_master
+    decode_slave = _decode_slave
 
-    if command == ResponseData.command:
-        return ResponseData.from_bytes(payload)
 
-    if command == ResponseRmu.command:
-        return ResponseRmu.from_bytes(payload)
+def _parse_master(data: bytes | memoryview):
+    frame = decode_master(data)
+    if frame is None:
+        frame = _decode_master(data)
+    address, data_command, data_payload = frame
+    return MessageMaster(address, parse_payload(data_command, data_payload))
 
-    if command == RequestRead.command and payload:
+
+def _parse_slave(data: bytes | memoryview):
+    frame = decode_slave(data)
+    if frame is None:
+        frame = _decode_slave(data)
+    data_command, data_payload = frame
+    return MessageSlave(parse_payload(data_command, data_payload))
+
+
+def _parse_unknown(data: bytes | memoryview):
+    return MessageUnknown(data[0], bytes(data[1:]))
+
+
+_START_DISPATCH: dict[int, Callable[[bytes | memoryview], Message]] = {
+    _START_MASTER: _parse_master,
+    _START_SLAVE: _parse_slave,
+    MessageAck.start: lambda data: MessageAck(),
+    MessageNak.start: lambda data: MessageNak(),
+}
+
+
+def parse(data: bytes | memoryview):
+    if len(data) < 5:
+        raise ParseError("Empty packet")
+
+    handler = _START_DISPATCH.get(data[0], _parse_unknown)
+    return handler(data)
+
+
+_START_SINGLE = bytes((MessageAck.start, MessageNak.start))
+_START_FRAME = bytes((_START_MASTER, _START_SLAVE))
+
+
+def _frame_size(data: memoryview) -> int:
+    start = data[0]
+    if start == _START_MASTER:
+        if len(data) < 5:
+            raise ParseError(f"Invalid packet length: {bytes(data)}")
+        return data[4] + 6
+
+    if start == _START_SLAVE:
+        # The length byte counts unescaped bytes, so walk the escaped
+        # frame until the checksum byte has been passed. Until the length
+        # byte has been seen the end is unknown and can't be reached.
+        end = 0
+        index = count = 1
+        while index < len(data):
+            if count == 2:
+                end = data[index] + 4
+            if (
+                data[index] == _START_SLAVE
+                and index + 1 < len(data)
+                and data[index + 1] == _START_SLAVE
+            ):
+                index += 2
+            else:
+                index += 1
+            count += 1
+            if count == end:
+                return index
+        raise ParseError(f"Invalid packet length: {bytes(data)}")
+
+    if start in _START_SINGLE:
+        return 1
+
+    # Not the start of a frame, skip ahead to the next master or slave marker
+    for index in range(1, len(data)):
+        if data[index] in _START_FRAME:
+            return index
+    return len(data)
+
+
+def iter_parse(data: bytes | memoryview) -> Iterator[Message]:
+    view = memoryview(data)
+    while view:
+        size = _frame_size(view)
+        handler = _START_DISPATCH.get(view[0])
+        if handler is not None:
+            yield handler(view[:size])
+        view = view[size:]
+
+
+# Null requests have no fields and are frozen, so one instance can be shared
+_REQUEST_READ_NULL = RequestReadNull()
+_REQUEST_WRITE_NULL = RequestWriteNull()
+
+
+def _parse_request_read(payload: bytes):
+    if payload:
         return RequestRead.from_bytes(payload)
+    return _REQUEST_READ_NULL
 
-    if command == RequestReadNull.command:
-        return RequestReadNull()
 
-    if command == RequestWrite.command and payload:
+def _parse_request_write(payload: bytes):
+    if payload:
         return RequestWrite.from_bytes(payload)
+    return _REQUEST_WRITE_NULL
+
+
+_PAYLOAD_DISPATCH: dict[int, Callable[[bytes], Command]] = {
+    ResponseRead.command: ResponseRead.from_bytes,
+    ResponseWrite.command: ResponseWrite.from_bytes,
+    ResponseData.command: ResponseData.from_bytes,
+    ResponseRmu.command: ResponseRmu.from_bytes,
+    RequestRead.command: _parse_request_read,
+    RequestWrite.command: _parse_request_write,
+    ResponseProduct.command: ResponseProduct.from_bytes,
+}
+
 
-    if command == RequestWriteNull.command:
-        return RequestWriteNull()
+def parse_payload(command: int, payload: bytes):
+    handler = _PAYLOAD_DISPATCH.get(command)
+    if handler is None:
+        return CommandUnknown(command, payload)
+    return handler(payload)
 
-    if command == ResponseProduct.command:
-        return ResponseProduct.from_bytes(payload)
 
-    return CommandUnknown(command, payload)
+@lru_cache(maxsize=1024)
+def _encode_request(command: RequestRead | RequestWrite) -> bytes:
+    return MessageSlave(command).to_bytes()
 
 
 class Connection(AsyncExitStack):
-    _udp: UDPSocket
+    _sock: socket.socket
 
     def __init__(
         self,
@@ -360,49 +487,92 @@ class Connection(AsyncExitStack):
         port_listen: int = DEFAULT_PORT_RX,
         port_read: int = DEFAULT_PORT_READ,
         port_write: int = DEFAULT_PORT_WRITE,
+        reuse_port: bool = False,
     ):
         super().__init__()
         self._port_listen = port_listen
-        self._port_read = port_read
-        self._port_write = port_write
+        self._port_by_type: dict[type[Command], int] = {
+            RequestRead: port_read,
+            RequestWrite: port_write,
+        }
         self._server_host = server_host
+        self._reuse_port = reuse_port
+        self._buffer = bytearray(RX_BUFFER)
+        self._view = memoryview(self._buffer)
 
     async def __aenter__(self):
-        self._udp = await self.enter_async_context(
-            await create_udp_socket(
-                family=socket.AF_INET,
-                local_port=self._port_listen,
-                local_host=DEFAULT_HOST_RX,
-            )
-        )
         await super().__aenter__()
-        return self
+        addresses = await getaddrinfo(
+            self._server_host, None, family=socket.AF_INET, type=socket.SOCK_DGRAM
+        )
+        self._server_address = addresses[0][4][0]
 
-    async def send(self, command: RequestRead | RequestWrite):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            sock.setblocking(False)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RX_SOCKET_BUFFER)
+            if self._reuse_port:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            sock.bind((DEFAULT_HOST_RX, self._port_listen))
+        except OSError:
+            sock.close()
+            raise
+        self._sock = sock
+        self.callback(self._close)
+        return self
 
-        data = MessageSlave(command).to_bytes()
-        if isinstance(command, RequestRead):
-            port = self._port_read
-        elif isinstance(command, RequestWrite):
-            port = self._port_write
+    def _close(self):
+        notify_closing(self._sock)
+        self._sock.close()
 
-        await self._udp.sendto(data, self._server_host, port)
+    async def send(self, command: RequestRead | RequestWrite):
+        await self.send_many((command,))
+
+    async def send_many(self, commands: Iterable[RequestRead | RequestWrite]):
+        frames = []
+        for command in commands:
+            port = self._port_by_type[type(command)]
+            frames.append((_encode_request(command), (self._server_address, port)))
+
+        for data, address in frames:
+            while True:
+                try:
+                    self._sock.sendto(data, address)
+                    break
+                except BlockingIOError:
+                    await wait_writable(self._sock)
 
     async def __aiter__(self):
-        async for packet, (host, port) in self._udp:
-            try:
-                if self._server_host != host:
-                    LOG.warning("Data from unexpected host %s", host)
-
-                message = parse(packet)
-                LOG.debug(
-                    "RX: %s from %s:%s -> %s", packet.hex(" "), host, port, message
-                )
-                yield message
-            except ParseError as exc:
-                LOG.error(
-                    "RX: %s from %s:%s -> %s", packet.hex(" "), host, port, str(exc)
-                )
+        while True:
+            await wait_readable(self._sock)
+            for _ in range(RX_BATCH):
+                try:
+                    size, (host, port) = self._sock.recvfrom_into(self._buffer)
+                except BlockingIOError:
+                    break
+                packet = self._view[:size]
+                try:
+                    if self._server_address != host:
+                        LOG.warning("Data from unexpected host %s", host)
+
+                    message = parse(packet)
+                    if LOG.isEnabledFor(logging.DEBUG):
+                        LOG.debug(
+                            "RX: %s from %s:%s -> %s",
+                            packet.hex(" "),
+                            host,
+                            port,
+                            message,
+                        )
+                    yield message
+                except ParseError as exc:
+                    LOG.error(
+                        "RX: %s from %s:%s -> %s",
+                        packet.hex(" "),
+                        host,
+                        port,
+                        str(exc),
+                    )
 
 
 M = TypeVar("M", bound=Command)
@@ -418,6 +588,9 @@ class ResponseFuture(Generic[M]):
         self.response = response
         self.event.set()
 
+    def done(self) -> bool:
+        return self.event.is_set()
+
     async def get(self):
         await self.event.wait()
         return self.response
@@ -428,6 +601,7 @@ class Controller(AbstractAsyncContextManager):
         """Initialize controller."""
         self._connection = connection
         self._listeners: set[Callable[[Command], None]] = set()
+        self._waiters: dict[tuple[type[Command], int], set[ResponseFuture]] = {}
 
     @contextmanager
     def listen(self, listener: Callable[[Command], None]):
@@ -437,33 +611,49 @@ class Controller(AbstractAsyncContextManager):
         finally:
             self._listeners.remove(listener)
 
+    @contextmanager
+    def _wait(self, reply_type: type[M], register: int) -> Iterator[ResponseFuture[M]]:
+        key = (reply_type, register)
+        response = ResponseFuture[M]()
+        waiters = self._waiters.setdefault(key, set())
+        waiters.add(response)
+        try:
+            yield response
+        finally:
+            waiters.remove(response)
+            if not waiters:
+                del self._waiters[key]
+
     async def read(self, register: int) -> int:
         command = RequestRead(register)
-        response = ResponseFuture[ResponseRead]()
-
-        def listener(reply: Command):
-            if not isinstance(reply, ResponseRead):
-                return
-            if reply.register != register:
-                return
-            response.set(reply)
-
-        with self.listen(listener):
+        with self._wait(ResponseRead, register) as response:
             await self._connection.send(command)
             return (await response.get()).value
 
+    async def read_many(
+        self, registers: Iterable[int], timeout: float | None = None
+    ) -> dict[int, int]:
+        """Read registers in one burst, leaving out any that miss the timeout."""
+        with ExitStack() as stack:
+            responses = {
+                register: stack.enter_context(self._wait(ResponseRead, register))
+                for register in registers
+            }
+            await self._connection.send_many(
+                [RequestRead(register) for register in responses]
+            )
+            with move_on_after(timeout):
+                for response in responses.values():
+                    await response.get()
+            return {
+                register: (await response.get()).value
+                for register, response in responses.items()
+                if response.done()
+            }
+
     async def write(self, register: int, value: int) -> int:
         command = RequestWrite(register, value)
-        response = ResponseFuture[ResponseWrite]()
-
-        def listener(reply: Command):
-            if not isinstance(reply, ResponseWrite):
-                return
-            if reply.register != register:
-                return
-            response.set(reply)
-
-        with self.listen(listener):
+        with self._wait(ResponseWrite, register) as response:
             await self._connection.send(command)
             await response.get()
             return
@@ -484,4 +674,10 @@ class Controller(AbstractAsyncContextManager):
             for listener in self._listeners:
                 listener(command)
 
+            reply = getattr(command, "command", None)
+            waiters = self._waiters.get((type(reply), getattr(reply, "register", None)))
+            if waiters:
+                for waiter in waiters:
+                    waiter.set(reply)
+
             yield command
@@ -1,7 +1,7 @@
 import logging
 
 import asyncclick as click
-from anyio import create_task_group, fail_after, run, sleep
+from anyio import create_task_group, run, sleep
 
 from . import (
     DEFAULT_PORT_READ,
@@ -28,11 +28,17 @@ def cli(log_level: str):
 @click.option("--port_listen", type=int, default=DEFAULT_PORT_RX)
 @click.option("--port_read", type=int, default=DEFAULT_PORT_READ)
 @click.option("--port_write", type=int, default=DEFAULT_PORT_WRITE)
+@click.option("--reuse_port", is_flag=True, default=False)
 async def monitor(
-    host: str, registers: list[int], port_listen: int, port_read: int, port_write: int
+    host: str,
+    registers: list[int],
+    port_listen: int,
+    port_read: int,
+    port_write: int,
+    reuse_port: bool,
 ):
     async with Connection(
-        host, port_listen, port_read, port_write
+        host, port_listen, port_read, port_write, reuse_port
     ) as connection, Controller(connection) as controller:
 
         async def reader():
@@ -41,13 +47,9 @@ async def monitor(
 
         async def update():
             while True:
+                values = await controller.read_many(registers, timeout=2)
                 for register in registers:
-                    try:
-                        async with fail_after(2):
-                            value = await controller.read(register)
-                        click.echo(f"READ {register}: {value}")
-                    except TimeoutError:
-                        click.echo(f"READ {register}: TIMEOUT")
+                    click.echo(f"READ {register}: {values.get(register, 'TIMEOUT')}")
                 await sleep(1.0)
 
         async with create_task_group() as tg:
@@ -0,0 +1,131 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+"""Compiled frame decoding.
+
+Mirrors _decode_master and _decode_slave in __init__.py. Frames that can't be
+decoded return None so the pure Python version can report the error.
+"""
+
+from cpython.bytes cimport PyBytes_AS_STRING, PyBytes_FromStringAndSize
+
+
+cdef enum:
+    START_MASTER = 0x5C
+    START_SLAVE = 0xC0
+
+
+cdef inline unsigned char _remap(unsigned char result, unsigned char key):
+    if result == key:
+        return ((key << 4) | (key >> 4)) & 0xFF
+    return result
+
+
+cdef inline Py_ssize_t _unescape(
+    const unsigned char *data, Py_ssize_t size, unsigned char *out, unsigned char key
+):
+    cdef Py_ssize_t index = 1
+    cdef Py_ssize_t length = 0
+    if size == 0:
+        return 0
+    out[length] = data[0]
+    length += 1
+    while index < size:
+        out[length] = data[index]
+        length += 1
+        if data[index] == key and index + 1 < size and data[index + 1] == key:
+            index += 2
+        else:
+            index += 1
+    return length
+
+
+cdef bytes _unescaped(const unsigned char *data, Py_ssize_t size, unsigned char key):
+    cdef bytes out = PyBytes_FromStringAndSize(NULL, size)
+    cdef Py_ssize_t length = _unescape(
+        data, size, <unsigned char *>PyBytes_AS_STRING(out), key
+    )
+    if length == size:
+        return out
+    return out[:length]
+
+
+def decode_master(const unsigned char[::1] data):
+    cdef Py_ssize_t size = data.shape[0]
+    cdef Py_ssize_t length, index, count
+    cdef unsigned char value
+    cdef unsigned char result
+    cdef bytes payload
+    cdef unsigned char *out
+    if size < 5:
+        return None
+    length = data[4]
+    if size < length + 6:
+        return None
+
+    # The checksum covers the escaped payload, so it is accumulated in the
+    # same pass that unescapes it.
+    payload = PyBytes_FromStringAndSize(NULL, length)
+    out = <unsigned char *>PyBytes_AS_STRING(payload)
+    result = data[2] ^ data[3] ^ data[4]
+    index = 0
+    count = 0
+    while index < length:
+        value = data[5 + index]
+        result ^= value
+        out[count] = value
+        count += 1
+        if (
+            value == START_MASTER
+            and index > 0
+            and index + 1 < length
+            and data[6 + index] == START_MASTER
+        ):
+            result ^= START_MASTER
+            index += 2
+        else:
+            index += 1
+
+    if _remap(result, START_MASTER) != data[5 + length]:
+        return None
+    if count != length:
+        payload = payload[:count]
+    return data[2], data[3], payload
+
+
+def decode_slave(const unsigned char[::1] data):
+    cdef Py_ssize_t size = data.shape[0]
+    cdef Py_ssize_t index, count
+    cdef Py_ssize_t end = 3
+    cdef unsigned char value
+    cdef unsigned char result
+    cdef bytes frame
+    cdef unsigned char *out
+    if size < 3:
+        return None
+
+    # Unescape the frame while accumulating the checksum over the unescaped
+    # bytes, the end of the checksummed region is known once the length byte
+    # has been seen.
+    frame = PyBytes_FromStringAndSize(NULL, size)
+    out = <unsigned char *>PyBytes_AS_STRING(frame)
+    out[0] = data[0]
+    result = data[0]
+    index = 1
+    count = 1
+    while index < size:
+        value = data[index]
+        out[count] = value
+        if count < end:
+            result ^= value
+            if count == 2:
+                end = 3 + value
+        count += 1
+        if value == START_SLAVE and index + 1 < size and data[index + 1] == START_SLAVE:
+            index += 2
+        else:
+            index += 1
+
+    if count < end + 1:
+        return None
+    if _remap(result, START_SLAVE) != out[end]:
+        return None
+    return out[1], _unescaped(&out[3], end - 3, START_SLAVE)
@@ -1,10 +1,21 @@
 from setuptools import find_packages, setup
 
+try:
+    from Cython.Build import cythonize
+except ImportError:
+    ext_modules = []
+else:
+    ext_modules = cythonize("nibeudp/_parse.pyx", language_level=3)
+    for ext_module in ext_modules:
+        ext_module.optional = True
+
 setup(
     name="nibeudp",
     packages=find_packages(),
+    python_requires=">=3.10",
     install_requires=[
-        "anyio",
+        "anyio>=4.7",
     ],
     extras_require={"cli": ["asyncclick==8.*"]},
+    ext_modules=ext_modules,
 )
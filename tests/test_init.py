@@ -1,14 +1,30 @@
 from __future__ import annotations
 
+import logging
+import socket
+
 import pytest
-from anyio import create_task_group, fail_after, run, sleep
+from anyio import (
+    create_memory_object_stream,
+    create_task_group,
+    create_udp_socket,
+    fail_after,
+    run,
+    sleep,
+)
+from anyio.abc import SocketAttribute
 
 from nibeudp import (
     Command,
     CommandUnknown,
+    Connection,
+    Controller,
     Message,
+    MessageAck,
     MessageMaster,
+    MessageNak,
     MessageSlave,
+    ParseError,
     RequestRead,
     RequestReadNull,
     RequestWrite,
@@ -18,7 +34,14 @@ from nibeudp import (
     ResponseProduct,
     ResponseRead,
     ResponseRmu,
+    ResponseWrite,
+    _decode_master,
+    _decode_slave,
+    calculate_checksum,
+    escape,
+    iter_parse,
     parse,
+    unescape,
 )
 
 
@@ -26,31 +49,36 @@ from nibeudp import (
     "data,result",
     [
         pytest.param(
-            "5c 00 20 6d 0b" + b"\x01$\xe3F1155-16".hex(" ") + "ec",
+            bytes.fromhex("5c 00 20 6d 0b")
+            + b"\x01$\xe3F1155-16"
+            + bytes.fromhex("ec"),
             (MessageMaster(0x20, ResponseProduct(1, 9443, "F1155-16"))),
             id="Product Data",
         ),
         pytest.param(
-            "5c 00 02 a0 03 00 5c 5c a1",
+            bytes.fromhex("5c 00 02 a0 03 00 5c 5c a1"),
             (MessageMaster(0x02, CommandUnknown(0xA0, bytes.fromhex("00 5c")))),
+            id="Escaped payload",
         ),
         pytest.param(
-            "5c 00 20 6b 00 4b a8",
+            bytes.fromhex("5c 00 20 6b 00 4b a8"),
             (MessageMaster(0x20, RequestWriteNull())),
             id="Buggy server responding with extra byte",
         ),
         pytest.param(
-            "5c 00 20 6b 00 4b",
+            bytes.fromhex("5c 00 20 6b 00 4b"),
             (MessageMaster(0x20, RequestWriteNull())),
             id="Frame from MODBUS40",
         ),
         pytest.param(
-            "5C 00 19 60 00 79",
+            bytes.fromhex("5C 00 19 60 00 79"),
             (MessageMaster(0x19, CommandUnknown(0x60, b""))),
             id="Frame from RMU40",
         ),
         pytest.param(
-            "5C 00 19 62 18 00 80 00 80 00 00 00 00 00 80 00 00 00 00 00 0B 0B 00 00 00 01 00 00 05 E7",
+            bytes.fromhex(
+                "5C 00 19 62 18 00 80 00 80 00 00 00 00 00 80 00 00 00 00 00 0B 0B 00 00 00 01 00 00 05 E7"
+            ),
             (
                 MessageMaster(
                     0x19,
@@ -64,7 +92,9 @@ from nibeudp import (
             id="Frame from RMU40",
         ),
         pytest.param(
-            "5C 00 20 68 50 01 A8 1F 01 00 A8 64 00 FD A7 D0 03 44 9C 1E 00 4F 9C A0 00 50 9C 78 00 51 9C 03 01 52 9C 1B 01 87 9C 14 01 4E 9C C6 01 47 9C 01 01 15 B9 B0 FF 3A B9 4B 00 C9 AF 00 00 48 9C 0D 01 4C 9C E7 00 4B 9C 00 00 FF FF 00 00 FF FF 00 00 FF FF 00 00 45",
+            bytes.fromhex(
+                "5C 00 20 68 50 01 A8 1F 01 00 A8 64 00 FD A7 D0 03 44 9C 1E 00 4F 9C A0 00 50 9C 78 00 51 9C 03 01 52 9C 1B 01 87 9C 14 01 4E 9C C6 01 47 9C 01 01 15 B9 B0 FF 3A B9 4B 00 C9 AF 00 00 48 9C 0D 01 4C 9C E7 00 4B 9C 00 00 FF FF 00 00 FF FF 00 00 FF FF 00 00 45"
+            ),
             (
                 MessageMaster(
                     0x20,
@@ -94,22 +124,119 @@ from nibeudp import (
             id="Data frame from MODBUS40",
         ),
         pytest.param(
-            "5C 00 20 69 00 49",
+            bytes.fromhex("5C 00 20 69 00 49"),
             (MessageMaster(0x20, RequestReadNull())),
             id="Token Frame from MODBUS40",
         ),
         pytest.param(
-            "C0 69 02 34 12 8d",
+            bytes.fromhex("C0 69 02 34 12 8d"),
             (MessageSlave(RequestRead(0x1234))),
             id="Slave read request",
         ),
     ],
 )
-def test_parse(data: str, result):
-    message = parse(bytes.fromhex(data))
+def test_parse(data: bytes, result):
+    message = parse(data)
+    assert message == result
+
+    message = parse(memoryview(data))
     assert message == result
 
 
+@pytest.mark.parametrize(
+    "data, result",
+    [
+        pytest.param(
+            "5c 00 20 69 00 49 C0 69 02 34 12 8d",
+            [MessageMaster(0x20, RequestReadNull()), MessageSlave(RequestRead(0x1234))],
+            id="Token and read request",
+        ),
+        pytest.param(
+            "C0 69 02 C0 C0 12 79 5c 00 02 a0 03 00 5c 5c a1",
+            [
+                MessageSlave(RequestRead(0x12C0)),
+                MessageMaster(0x02, CommandUnknown(0xA0, bytes.fromhex("00 5c"))),
+            ],
+            id="Escaped frames",
+        ),
+        pytest.param(
+            "5c 00 20 69 00 49 06 15",
+            [MessageMaster(0x20, RequestReadNull()), MessageAck(), MessageNak()],
+            id="Token with ack and nak",
+        ),
+        pytest.param(
+            "5c 00 20 6b 00 4b a8",
+            [MessageMaster(0x20, RequestWriteNull())],
+            id="Trailing byte after frame",
+        ),
+        pytest.param(
+            "5c 00 20 6b 00 4b a8 5c 00 20 69 00 49",
+            [
+                MessageMaster(0x20, RequestWriteNull()),
+                MessageMaster(0x20, RequestReadNull()),
+            ],
+            id="Garbage between frames",
+        ),
+    ],
+)
+def test_iter_parse(data: str, result: list[Message]):
+    assert list(iter_parse(bytes.fromhex(data))) == result
+
+
+@pytest.mark.parametrize(
+    "data",
+    ["c0 69", "c0 69 02 34", "5c 00 20", "5c 00 20 69 02 49", "5c 00 20 69 00 49 c0"],
+)
+def test_iter_parse_truncated(data: str):
+    with pytest.raises(ParseError):
+        list(iter_parse(bytes.fromhex(data)))
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        "5c 00 02 a0 03 00 5c 5c a1",
+        "C0 69 02 34 12 8d",
+        "01 02 03 04 05",
+    ],
+)
+def test_parse_reused_buffer(data: str):
+    buffer = bytearray(bytes.fromhex(data))
+    message = parse(memoryview(buffer))
+    expected = parse(bytes(buffer))
+
+    buffer[:] = bytes(len(buffer))
+    assert message == expected
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        "5c 00 20 6b 00 4b a8",
+        "5c 00 02 a0 03 00 5c 5c a1",
+        "5c 00 20 6b 00 4c",
+        "5c 00 20 6b 05 4b",
+        "C0 69 02 34 12 8d",
+        "C0 69 02 C0 C0 12 8d",
+        "C0 69 02 34 12 8e",
+    ],
+)
+def test_decode_compiled(data: str):
+    compiled = pytest.importorskip("nibeudp._parse")
+    frame = bytes.fromhex(data)
+
+    if frame[0] == MessageMaster.start:
+        decode, expected = compiled.decode_master, _decode_master
+    else:
+        decode, expected = compiled.decode_slave, _decode_slave
+
+    try:
+        result = expected(frame)
+    except ParseError:
+        result = None
+    assert decode(frame) == result
+
+
 @pytest.mark.parametrize(
     "message,expected",
     [
@@ -118,18 +245,74 @@ def test_parse(data: str, result):
         pytest.param(
             MessageSlave(RequestWrite(12345, 987654)), "C0 6B 06 39 30 06 12 0F 00 BF"
         ),
+        pytest.param(MessageMaster(0x20, RequestWriteNull()), "5c 00 20 6b 00 4b"),
+        pytest.param(MessageMaster(0x20, RequestReadNull()), "5C 00 20 69 00 49"),
+        pytest.param(
+            MessageMaster(0x02, CommandUnknown(0xA0, bytes.fromhex("00 5c"))),
+            "5c 00 02 a0 03 00 5c 5c a1",
+        ),
     ],
 )
 def test_construct(message: Message, expected: str):
     assert message.to_bytes() == bytes.fromhex(expected)
 
 
+@pytest.mark.parametrize(
+    "message",
+    [
+        MessageMaster(0x20, ResponseData({1234: 5678})),
+        MessageMaster(0x20, ResponseRead(1234, 5678)),
+        MessageSlave(RequestWrite(1234, 5678)),
+        MessageSlave(RequestReadNull()),
+        MessageMaster(0x19, CommandUnknown(0x60, b"")),
+    ],
+)
+def test_slots(message: MessageMaster | MessageSlave):
+    assert not hasattr(message, "__dict__")
+    assert not hasattr(message.command, "__dict__")
+
+
+@pytest.mark.parametrize(
+    "data",
+    ["5c 00 20 69 00 49", "5c 00 20 6b 00 4b"],
+)
+def test_parse_null_shared(data: str):
+    assert parse(bytes.fromhex(data)).command is parse(bytes.fromhex(data)).command
+
+
+@pytest.mark.parametrize(
+    "message",
+    [
+        MessageMaster(0x20, ResponseRead(1234, 5678)),
+        MessageMaster(0x20, ResponseRead(0x5C5C, 0x5C)),
+        MessageMaster(0x20, ResponseWrite(0x5C)),
+        MessageMaster(0x20, ResponseData({0x5C00: 0x5C5C, 40004: 30})),
+    ],
+)
+def test_master_roundtrip(message: MessageMaster):
+    assert parse(message.to_bytes()) == message
+
+
 @pytest.mark.parametrize("parameters", [{1234: 5678, 4321: 8765}])
 def test_response_data(parameters: dict[int, int]):
     message = ResponseData.from_bytes(ResponseData(parameters).to_bytes())
     assert message.parameters == parameters
 
 
+@pytest.mark.parametrize(
+    "payload",
+    [
+        "",
+        "01 A8 1F 01 00 A8 64 00",
+        "01 A8 1F 01 FF FF 00 00 00 A8 64 00 FF FF 00 00",
+    ],
+)
+def test_response_data_array(payload: str):
+    data = bytes.fromhex(payload)
+    registers, values = ResponseData.from_bytes_array(data)
+    assert dict(zip(registers, values)) == ResponseData.from_bytes(data).parameters
+
+
 @pytest.mark.parametrize("register,value", [(1234, 5678), (4321, 8765)])
 def test_response_read(register: int, value: int):
     message = ResponseRead.from_bytes(ResponseRead(register, value).to_bytes())
@@ -137,6 +320,29 @@ def test_response_read(register: int, value: int):
     assert message.value == value
 
 
+@pytest.mark.parametrize(
+    "data,escaped",
+    [
+        ("", ""),
+        ("5c", "5c"),
+        ("5c 00 5c 01", "5c 00 5c 5c 01"),
+        ("5c 5c 5c", "5c 5c 5c 5c 5c"),
+    ],
+)
+def test_escape(data: str, escaped: str):
+    assert escape(bytes.fromhex(data), 0x5C) == bytes.fromhex(escaped)
+    assert unescape(bytes.fromhex(escaped), 0x5C) == bytes.fromhex(data)
+
+
+@pytest.mark.parametrize("length", [0, 1, 6, 39, 40, 86, 258])
+def test_calculate_checksum(length: int):
+    data = bytes((idx * 37 + 11) & 0xFF for idx in range(length))
+    expected = 0
+    for value in data:
+        expected ^= value
+    assert calculate_checksum(data, 0x00) == expected
+
+
 @pytest.mark.asyncio
 async def test_response_future_read():
 
@@ -155,3 +361,127 @@ async def test_response_future_read():
         assert result
         assert result.register == 1234
         assert result.value == 5678
+
+
+class FakeConnection:
+    def __init__(self) -> None:
+        self.sent: list[Command] = []
+        self.silent: set[int] = set()
+        self._send, self._receive = create_memory_object_stream(10)
+
+    async def send(self, command: Command):
+        self.sent.append(command)
+        if command.register in self.silent:
+            return
+        if isinstance(command, RequestRead):
+            reply = ResponseRead(command.register, command.register * 2)
+        else:
+            reply = ResponseWrite(command.register)
+        await self._send.send(MessageMaster(0x20, ResponseRead(4321, 1)))
+        await self._send.send(MessageMaster(0x20, reply))
+
+    async def send_many(self, commands: list[Command]):
+        for command in commands:
+            await self.send(command)
+
+    async def __aenter__(self) -> FakeConnection:
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self._send.close()
+        self._receive.close()
+
+    async def __aiter__(self):
+        async for message in self._receive:
+            yield message
+
+
+@pytest.mark.asyncio
+async def test_controller_read_write():
+    connection = FakeConnection()
+
+    with fail_after(10):
+        async with connection, Controller(
+            connection
+        ) as controller, create_task_group() as tg:
+
+            async def reader():
+                async for _ in controller:
+                    pass
+
+            tg.start_soon(reader)
+
+            assert await controller.read(1234) == 2468
+            await controller.write(1234, 5678)
+            assert await controller.read_many([1, 2]) == {1: 2, 2: 4}
+
+            connection.silent.add(3)
+            assert await controller.read_many([3, 4], timeout=0.1) == {4: 8}
+            assert not controller._waiters
+
+            tg.cancel_scope.cancel()
+
+    assert connection.sent == [
+        RequestRead(1234),
+        RequestWrite(1234, 5678),
+        RequestRead(1),
+        RequestRead(2),
+        RequestRead(3),
+        RequestRead(4),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_connection_loopback(caplog: pytest.LogCaptureFixture):
+    caplog.set_level(logging.WARNING, logger="nibeudp")
+
+    with fail_after(10):
+        async with await create_udp_socket(
+            family=socket.AF_INET, local_host="127.0.0.1"
+        ) as pump:
+            port = pump.extra(SocketAttribute.local_port)
+
+            async def serve():
+                async for data, (host, client_port) in pump:
+                    command = parse(data).command
+                    if command.register == 3:
+                        continue
+                    if isinstance(command, RequestRead):
+                        reply = ResponseRead(command.register, command.register * 2)
+                    else:
+                        reply = ResponseWrite(command.register)
+
+                    # Invalid datagrams ahead of each reply are logged and skipped
+                    await pump.sendto(
+                        bytes.fromhex("5c 00 20 6b 00 4c"), host, client_port
+                    )
+                    await pump.sendto(bytes.fromhex("5c 00"), host, client_port)
+                    await pump.sendto(
+                        MessageMaster(0x20, reply).to_bytes(), host, client_port
+                    )
+
+            async with Connection("127.0.0.1", 0, port, port) as connection, Controller(
+                connection
+            ) as controller, create_task_group() as tg:
+
+                async def reader():
+                    async for _ in controller:
+                        pass
+
+                tg.start_soon(serve)
+                tg.start_soon(reader)
+
+                assert await controller.read(1234) == 2468
+                await controller.write(1234, 5678)
+                assert await controller.read_many([1, 3, 4], timeout=0.2) == {
+                    1: 2,
+                    4: 8,
+                }
+                assert not controller._waiters
+
+                tg.cancel_scope.cancel()
+
+    messages = [record.getMessage() for record in caplog.records]
+    assert all(record.levelno == logging.ERROR for record in caplog.records)
+    assert any("Invalid checksum" in message for message in messages)
+    assert any("Empty packet" in message for message in messages)